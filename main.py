@@ -1,15 +1,36 @@
+import collections
+import functools
 import os
 import string
-import re
 import unicodedata
 
 # Use the existing Trie structure from trie.py
-from trie import Trie
+from trie import FrozenTrie, Trie
 
+# Maximum number of character edits tolerated when matching an address name
+MAX_EDIT_DISTANCE = 2
+
+# Mapping of non-Vietnamese characters to their closest Vietnamese spelling
+_NON_VIET_CHARS = {
+    'j': 'i',
+    'z': 's',
+    'w': 'v',
+    'f': 'ph',
+}
+_NON_VIET_TABLE = str.maketrans(_NON_VIET_CHARS)
+
+# Bumped whenever the keys stored in the tries or their layout change, so that stale
+# dataset/*.trie.npz caches are not picked up
+_TRIE_CACHE_VERSION = 4
+
+# Number of extracted results each Solution keeps, matching preprocess_text's cache
+_RESULT_CACHE_SIZE = 4096
+
+@functools.lru_cache(maxsize=4096)
 def preprocess_text(text):
     """
     Preprocess the input text according to the following rules:
-    1. Lower text, remove pre and post white-space
+    1. Normalize to NFC, lower text, remove pre and post white-space
     2. Remove non-Vietnamese characters (j, z, w, ...)
     3. Remove pre and post punctuation
     
@@ -19,20 +40,13 @@ def preprocess_text(text):
     Returns:
         The preprocessed text string
     """
-    # 1. Convert to lowercase and remove leading/trailing whitespaces
-    text = text.lower().strip()
+    # 1. Normalize to composed Unicode (NFC) so precomposed and decomposed
+    # Vietnamese diacritics compare equal, then convert to lowercase and
+    # remove leading/trailing whitespaces
+    text = unicodedata.normalize('NFC', text).lower().strip()
     
-    # 2. Remove non-Vietnamese characters (j, z, w, ...)
-    # Create a mapping of characters to be replaced
-    non_viet_chars = {
-        'j': 'i',
-        'z': 's',
-        'w': 'v',
-        'f': 'ph',
-    }
-    
-    for char, replacement in non_viet_chars.items():
-        text = text.replace(char, replacement)
+    # 2. Remove non-Vietnamese characters (j, z, w, ...) in a single pass
+    text = text.translate(_NON_VIET_TABLE)
     
     # 3. Remove pre and post punctuation
     text = text.strip(string.punctuation)
@@ -42,74 +56,53 @@ def preprocess_text(text):
     
     return text
 
-def generate_variants(word):
+def insert_with_variants(trie, word, value=None):
     """
-    Generate variants of the word with the following cases:
-    1. Missing character (deletion)
-    2. Replaced character (substitution)
-    3. Inserted character (insertion)
+    Insert a word into the trie
     
     Args:
-        word: The original word
-        
-    Returns:
-        A list of word variants
+        trie: The Trie to insert into
+        word: The word to insert, already lowercased like preprocessed queries
+        value: Value associated with the word, typically the original-cased name
     """
-    variants = set()
-    
-    # Original word
-    variants.add(word)
-    
-    # Case 1: Missing character (deletion)
-    for i in range(len(word)):
-        # Skip deletion of spaces to maintain word boundaries
-        if word[i] == ' ':
-            continue
-        variant = word[:i] + word[i+1:]
-        variants.add(variant)
-    
-    # Case 2: Replaced character (substitution)
-    for i in range(len(word)):
-        # Skip replacing spaces to maintain word boundaries
-        if word[i] == ' ':
-            continue
-        for char in string.ascii_lowercase + 'áàảãạăắằẳẵặâấầẩẫậđéèẻẽẹêếềểễệíìỉĩịóòỏõọôốồổỗộơớờởỡợúùủũụưứừửữựýỳỷỹỵ':
-            if char != word[i]:
-                variant = word[:i] + char + word[i+1:]
-                variants.add(variant)
+    # Keys are stored in NFC, the same form preprocess_text produces for queries
+    word = unicodedata.normalize('NFC', word)
     
-    # Case 3: Inserted character (insertion)
-    for i in range(len(word) + 1):
-        for char in string.ascii_lowercase + 'áàảãạăắằẳẵặâấầẩẫậđéèẻẽẹêếềểễệíìỉĩịóòỏõọôốồổỗộơớờởỡợúùủũụưứừửữựýỳỷỹỵ':
-            variant = word[:i] + char + word[i:]
-            variants.add(variant)
+    trie.insert(word, value)
     
-    return variants
+    # Typos are no longer enumerated as variants here; they are tolerated
+    # at query time by Trie.search_fuzzy
 
-def insert_with_variants(trie, word, value=None):
+def _build_trie(data_path, level):
     """
-    Insert a word and its variants into the trie
+    Create a Trie tree from the dataset file of one administrative level
     
     Args:
-        trie: The Trie to insert into
-        word: The word to insert
-        value: Value associated with the word
+        data_path: Path to the dataset directory
+        level: Administrative level, also the stem of its dataset file (e.g. "ward")
+        
+    Returns:
+        A Trie tree containing all names of that level, or None if the file cannot be read
     """
-    # First insert the original word
-    trie.insert(word, value)
+    trie = Trie()
+    file_path = os.path.join(data_path, f"{level}.txt")
     
-    # Also insert the lowercase version to ensure case-insensitive matching
-    lowercase_word = word.lower()
-    if lowercase_word != word:
-        trie.insert(lowercase_word, value)
-    
-    # Generate and insert variants based on the lowercase version
-    # to ensure we capture all potential typos
-    variants = generate_variants(lowercase_word)
-    for variant in variants:
-        # Insert variants but mark them as the original word
-        # This ensures searches for variants find the original word
-        trie.insert(variant, value)
+    try:
+        # Read and decode the whole file in one pass; utf-8-sig drops the
+        # byte order mark the dataset files start with
+        with open(file_path, 'rb') as file:
+            lines = file.read().decode('utf-8-sig').splitlines()
+        
+        for line in lines:
+            name = line.strip()
+            if name:  # Skip empty lines
+                # Match on the lowercase name, return the original one
+                insert_with_variants(trie, name.lower(), name)
+        
+        return trie
+    except Exception as e:
+        print(f"Error creating {level.capitalize()} Trie: {str(e)}")
+        return None
 
 def create_ward_trie(data_path):
     """
@@ -119,24 +112,12 @@ def create_ward_trie(data_path):
         data_path: Path to the dataset directory
         
     Returns:
-        A Trie tree containing all ward names and their variants
+        A Trie tree containing all ward names
     """
-    ward_trie = Trie()
-    file_path = os.path.join(data_path, "ward.txt")
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                ward_name = line.strip()
-                if ward_name:  # Skip empty lines
-                    # Insert the original word without preprocessing
-                    insert_with_variants(ward_trie, ward_name, ward_name)
-        
-        print(f"Ward Trie created successfully with data from {file_path}")
-        return ward_trie
-    except Exception as e:
-        print(f"Error creating Ward Trie: {str(e)}")
-        return None
+    ward_trie = _build_trie(data_path, "ward")
+    if ward_trie is not None:
+        print(f"Ward Trie created successfully with data from {os.path.join(data_path, 'ward.txt')}")
+    return ward_trie
 
 def create_district_trie(data_path):
     """
@@ -146,24 +127,12 @@ def create_district_trie(data_path):
         data_path: Path to the dataset directory
         
     Returns:
-        A Trie tree containing all district names and their variants
+        A Trie tree containing all district names
     """
-    district_trie = Trie()
-    file_path = os.path.join(data_path, "district.txt")
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                district_name = line.strip()
-                if district_name:  # Skip empty lines
-                    # Insert the original word without preprocessing
-                    insert_with_variants(district_trie, district_name, district_name)
-        
-        print(f"District Trie created successfully with data from {file_path}")
-        return district_trie
-    except Exception as e:
-        print(f"Error creating District Trie: {str(e)}")
-        return None
+    district_trie = _build_trie(data_path, "district")
+    if district_trie is not None:
+        print(f"District Trie created successfully with data from {os.path.join(data_path, 'district.txt')}")
+    return district_trie
 
 def create_province_trie(data_path):
     """
@@ -173,107 +142,134 @@ def create_province_trie(data_path):
         data_path: Path to the dataset directory
         
     Returns:
-        A Trie tree containing all province names and their variants
+        A Trie tree containing all province names
+    """
+    province_trie = _build_trie(data_path, "province")
+    if province_trie is not None:
+        print(f"Province Trie created successfully with data from {os.path.join(data_path, 'province.txt')}")
+    return province_trie
+
+def _load_frozen_trie(data_path, level):
     """
-    province_trie = Trie()
-    file_path = os.path.join(data_path, "province.txt")
+    Load a frozen trie from its on-disk cache, building and caching it if needed
+    
+    Args:
+        data_path: Path to the dataset directory
+        level: Administrative level, also the stem of its dataset file (e.g. "ward")
+        
+    Returns:
+        A FrozenTrie for the given level
+    """
+    source_path = os.path.join(data_path, f"{level}.txt")
+    cache_path = os.path.join(data_path, f"{level}.v{_TRIE_CACHE_VERSION}.trie.npz")
+    
+    # Reuse the cache only while it is newer than the names it was built from;
+    # a missing, unreadable or damaged cache file is treated as a miss
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(source_path):
+            return FrozenTrie.load(cache_path)
+    except Exception:
+        pass
+    
+    trie = _build_trie(data_path, level)
+    
+    # A failed build is served empty for this run only, never cached, so the
+    # next start retries reading the dataset file
+    if trie is None:
+        return Trie().freeze()
+    
+    frozen_trie = trie.freeze()
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                province_name = line.strip()
-                if province_name:  # Skip empty lines
-                    # Insert the original word without preprocessing
-                    insert_with_variants(province_trie, province_name, province_name)
+        frozen_trie.save(cache_path)
+    except OSError as e:
+        print(f"Could not cache {level} Trie: {str(e)}")
+    
+    return frozen_trie
+
+def _dataset_mtimes(data_path):
+    """
+    Get the modification times of the province, district and ward files
+    
+    Args:
+        data_path: Path to the dataset directory
         
-        print(f"Province Trie created successfully with data from {file_path}")
-        return province_trie
-    except Exception as e:
-        print(f"Error creating Province Trie: {str(e)}")
-        return None
+    Returns:
+        A tuple of modification times, with None for files that cannot be read
+    """
+    mtimes = []
+    for level in ("province", "district", "ward"):
+        try:
+            mtimes.append(os.path.getmtime(os.path.join(data_path, f"{level}.txt")))
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+@functools.lru_cache(maxsize=8)
+def _load_tries(data_path, mtimes):
+    """
+    Load the frozen province, district and ward tries once per version of the dataset
+    
+    Args:
+        data_path: Path to the dataset directory
+        mtimes: Modification times of the dataset files (see _dataset_mtimes), so that
+            edited files are reloaded instead of served from the cache
+        
+    Returns:
+        A (province, district, ward) tuple of FrozenTrie objects shared by every caller
+    """
+    tries = (
+        _load_frozen_trie(data_path, "province"),
+        _load_frozen_trie(data_path, "district"),
+        _load_frozen_trie(data_path, "ward"),
+    )
+    
+    # Compile (or load the cached compilation of) the Numba walkers now, so
+    # the one-off cost is not paid inside the first timed process() call
+    for trie in tries:
+        trie.search("a")
+        trie.search_fuzzy("a", max_dist=MAX_EDIT_DISTANCE)
+    
+    return tries
 
 # Solution class for testing according to GettingStarted.ipynb requirements
 class Solution:
     def __init__(self):
-        # List province, district, ward file paths
-        self.province_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset", "province.txt")
-        self.district_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset", "district.txt")
-        self.ward_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset", "ward.txt")
+        self.data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset")
         
-        # Create the trie data structures for each administrative level
-        self.province_trie = self._create_province_trie()
-        self.district_trie = self._create_district_trie()
-        self.ward_trie = self._create_ward_trie()
+        # The tries for each administrative level are built on first use and
+        # shared by all later Solution instances while the dataset is unchanged
+        self.province_trie, self.district_trie, self.ward_trie = _load_tries(
+            self.data_path, _dataset_mtimes(self.data_path)
+        )
         
-    def _create_province_trie(self):
-        """
-        Create a Trie tree from province.txt file
+        # Most recently extracted results, keyed by preprocessed address text
+        self._cache = collections.OrderedDict()
         
-        Returns:
-            A Trie tree containing all province names and their variants
-        """
-        province_trie = Trie()
-        
-        try:
-            with open(self.province_path, 'r', encoding='utf-8') as file:
-                for line in file:
-                    province_name = line.strip()
-                    if province_name:  # Skip empty lines
-                        # Insert the original word without preprocessing
-                        insert_with_variants(province_trie, province_name, province_name)
-            
-            return province_trie
-        except Exception as e:
-            print(f"Error creating Province Trie: {str(e)}")
-            return Trie()
-    
-    def _create_district_trie(self):
+    def process(self, address_text):
         """
-        Create a Trie tree from district.txt file
-        
-        Returns:
-            A Trie tree containing all district names and their variants
+        Extract address, performing three separate searches for each administrative level.
         """
-        district_trie = Trie()
+        # 1. preprocess text
+        processed_text = preprocess_text(address_text)
         
-        try:
-            with open(self.district_path, 'r', encoding='utf-8') as file:
-                for line in file:
-                    district_name = line.strip()
-                    if district_name:  # Skip empty lines
-                        # Insert the original word without preprocessing
-                        insert_with_variants(district_trie, district_name, district_name)
+        # Addresses that preprocess to the same text share one result; callers
+        # get a copy so they can annotate it freely
+        result = self._cache.get(processed_text)
+        if result is None:
+            result = self._process_preprocessed(processed_text)
+            self._cache[processed_text] = result
             
-            return district_trie
-        except Exception as e:
-            print(f"Error creating District Trie: {str(e)}")
-            return Trie()
-    
-    def _create_ward_trie(self):
-        """
-        Create a Trie tree from ward.txt file
-        
-        Returns:
-            A Trie tree containing all ward names and their variants
-        """
-        ward_trie = Trie()
-        
-        try:
-            with open(self.ward_path, 'r', encoding='utf-8') as file:
-                for line in file:
-                    ward_name = line.strip()
-                    if ward_name:  # Skip empty lines
-                        # Insert the original word without preprocessing
-                        insert_with_variants(ward_trie, ward_name, ward_name)
-            
-            return ward_trie
-        except Exception as e:
-            print(f"Error creating Ward Trie: {str(e)}")
-            return Trie()
+            # Evict the least recently used result once the cache is full
+            if len(self._cache) > _RESULT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(processed_text)
+        return dict(result)
     
-    def process(self, address_text):
+    def _process_preprocessed(self, processed_text):
         """
-        Extract address, performing three separate searches for each administrative level.
+        Extract address from text that has already gone through preprocess_text.
         """
         result = {
             "province": "",
@@ -281,80 +277,62 @@ class Solution:
             "ward": ""
         }
         
-        # 1. preprocess text
-        processed_text = preprocess_text(address_text)
-        
         # 2. split string by comma
         segments = [s.strip() for s in processed_text.split(',') if s.strip()]
         
-        # TEMP variable to hold unmatched segments
-        unmatched_segments = list(segments)
+        # TEMP variable to hold unmatched segments, each kept as the list of its
+        # word suffixes so that all three passes share the same phrases
+        unmatched_segments = [
+            [" ".join(words[i:]) for i in range(len(words))]
+            for words in (segment.split() for segment in segments)
+        ]
         
-        # =================================================================
-        # FIND PROVINCE (PROVINCE)
-        # =================================================================
-        segments_after_province_pass = []
-        for segment in reversed(unmatched_segments):
-            words = segment.split()
-            found = False
-            for i in range(len(words)):
-                phrase = " ".join(words[i:])
-                is_found, value, _ = self.province_trie.search(phrase)
-                if is_found and not result["province"]:
-                    result["province"] = value
-                    # Store the remaining part for next passes
-                    remaining_part = " ".join(words[:i])
-                    if remaining_part:
-                        segments_after_province_pass.insert(0, remaining_part)
-                    found = True
-                    break
-            if not found:
-                segments_after_province_pass.insert(0, segment)
-        unmatched_segments = segments_after_province_pass
-
-        # =================================================================
-        # FIND DISTRICT (DISTRICT)
-        # =================================================================
-        segments_after_district_pass = []
-        for segment in reversed(unmatched_segments):
-            words = segment.split()
-            found = False
-            for i in range(len(words)):
-                phrase = " ".join(words[i:])
-                is_found, value, _ = self.district_trie.search(phrase)
-                if is_found and not result["district"]:
-                    result["district"] = value
-                    remaining_part = " ".join(words[:i])
-                    if remaining_part:
-                        segments_after_district_pass.insert(0, remaining_part)
-                    found = True
-                    break
-            if not found:
-                segments_after_district_pass.insert(0, segment)
-        unmatched_segments = segments_after_district_pass
-
-        # =================================================================
-        # FIND WARD (WARD)
-        # =================================================================
-        segments_after_ward_pass = []
-        for segment in reversed(unmatched_segments):
-            words = segment.split()
+        # Search right-to-left: province first, then district before it, then ward
+        result["province"], unmatched_segments = self._find_level(self.province_trie, unmatched_segments)
+        result["district"], unmatched_segments = self._find_level(self.district_trie, unmatched_segments)
+        result["ward"], unmatched_segments = self._find_level(self.ward_trie, unmatched_segments)
+        
+        return result
+    
+    def _find_level(self, trie, unmatched_segments):
+        """
+        Find the name of one administrative level in the unmatched segments.
+        
+        Segments are scanned right-to-left and, within a segment, the longest
+        suffix is tried first; the first suffix with a close enough match wins.
+        
+        Args:
+            trie: The FrozenTrie of the administrative level to search
+            unmatched_segments: Segments not yet matched, each as the list of its word suffixes
+            
+        Returns:
+            A (value, remaining_segments) tuple, where value is "" if nothing matched
+        """
+        found_value = ""
+        remaining_segments = []
+        
+        for suffixes in reversed(unmatched_segments):
+            # Once the name is known, the remaining segments pass through untouched
+            if found_value:
+                remaining_segments.append(suffixes)
+                continue
             found = False
-            for i in range(len(words)):
-                phrase = " ".join(words[i:])
-                is_found, value, _ = self.ward_trie.search(phrase)
-                if is_found and not result["ward"]:
-                    result["ward"] = value
-                    remaining_part = " ".join(words[:i])
-                    if remaining_part:
-                        segments_after_ward_pass.insert(0, remaining_part)
+            for i, phrase in enumerate(suffixes):
+                is_found, value, _ = trie.search_fuzzy(phrase, max_dist=MAX_EDIT_DISTANCE)
+                if is_found:
+                    found_value = value
+                    # Store the remaining part for next passes by cutting
+                    # " " + phrase off the end of the earlier suffixes
+                    if i:
+                        remaining_segments.append([suffix[:-len(phrase) - 1] for suffix in suffixes[:i]])
                     found = True
                     break
             if not found:
-                segments_after_ward_pass.insert(0, segment)
-        unmatched_segments = segments_after_ward_pass
+                remaining_segments.append(suffixes)
         
-        return result
+        # Segments were collected right-to-left; restore their original order
+        remaining_segments.reverse()
+        return found_value, remaining_segments
 
 # Example usage:
 if __name__ == "__main__":
@@ -379,7 +357,7 @@ if __name__ == "__main__":
     if district_trie:
         test_district = "Hà Đng"  # Missing 'o' from "Hà Đông"
         processed_query = preprocess_text(test_district)
-        is_found, value, word = district_trie.search(processed_query)
+        is_found, value, word = district_trie.search_fuzzy(processed_query)
         if is_found:
             print(f"Typo detected: '{test_district}' is probably '{value}'")
         else:
@@ -400,7 +378,7 @@ if __name__ == "__main__":
         test_province_with_j = " Hồ Zhí Minh "  # With 'z' instead of 'ch'
         processed_query = preprocess_text(test_province_with_j)
         print(f"Original: '{test_province_with_j}', Processed: '{processed_query}'")
-        is_found, value, word = province_trie.search(processed_query)
+        is_found, value, word = province_trie.search_fuzzy(processed_query)
         if is_found:
             print(f"Found province: '{value}'")
         else:
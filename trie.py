@@ -1,7 +1,189 @@
+import functools
+import os
+import tempfile
+
+import numpy as np
+from numba import njit
+
+# Keys at least this long have their edit-distance rows updated with NumPy;
+# for shorter keys the per-call overhead of the vector ops outweighs the loop
+VECTORIZE_MIN_KEY_LENGTH = 20
+
+
+def _next_row(prev_row, char, key):
+    """
+    Compute the edit-distance row for a trie edge with a plain Python loop.
+
+    Args:
+        prev_row: Edit distances between each prefix of key and the parent's path
+        char: The character on the edge being followed
+        key: The sequence being searched for
+
+    Returns:
+        tuple: (row, row_min) for the child node
+    """
+    cur_row = [prev_row[0] + 1]
+
+    for j in range(1, len(key) + 1):
+        cur_row.append(min(
+            prev_row[j] + 1,                            # deletion
+            cur_row[j - 1] + 1,                         # insertion
+            prev_row[j - 1] + (key[j - 1] != char),     # substitution
+        ))
+
+    return cur_row, min(cur_row)
+
+
+def _next_row_vectorized(prev_row, char, key_codes, offsets):
+    """
+    Compute the edit-distance row for a trie edge with NumPy vector ops.
+
+    Args:
+        prev_row: Edit distances between each prefix of key and the parent's path
+        char: The character on the edge being followed
+        key_codes: Code points of the sequence being searched for
+        offsets: The row 0, 1, ..., len(key), used to resolve insertions
+
+    Returns:
+        tuple: (row, row_min) for the child node
+    """
+    cur_row = np.empty_like(prev_row)
+    cur_row[0] = prev_row[0] + 1
+
+    # Deletion and substitution only depend on the parent's row
+    np.minimum(prev_row[1:] + 1, prev_row[:-1] + (key_codes != ord(char)), out=cur_row[1:])
+
+    # Insertion chains along the row: cur[j] = min(cur[j], cur[j - 1] + 1)
+    cur_row = np.minimum.accumulate(cur_row - offsets) + offsets
+
+    return cur_row, int(cur_row.min())
+
+
+@njit(cache=True)
+def _find_child(node_char, lo, hi, code):
+    """
+    Find a child edge within one node's child range.
+
+    Child ranges are short (most nodes have a single child), so a linear
+    scan over the contiguous range beats a binary search.
+
+    Args:
+        node_char: Code point on the edge leading into each node
+        lo: Index of the node's first child
+        hi: One past the index of the node's last child
+        code: Code point to look for
+
+    Returns:
+        int: Index of the matching child, or -1 if there is none
+    """
+    for child in range(lo, hi):
+        if node_char[child] == code:
+            return child
+    return -1
+
+
+@njit(cache=True)
+def _walk_exact(key_codes, node_char, child_start, terminal):
+    """
+    Exact lookup over a flattened trie, compiled with Numba.
+
+    Args:
+        key_codes: Code points of the sequence being searched for
+        node_char: Code point on the edge leading into each node
+        child_start: Children of node i occupy child_start[i]:child_start[i + 1]
+        terminal: Value id stored at each node, or -1 for non-terminal nodes
+
+    Returns:
+        int: Value id of the key, or -1 if it is not stored
+    """
+    node = 0
+    for code in key_codes:
+        node = _find_child(node_char, child_start[node], child_start[node + 1], code)
+        if node < 0:
+            return -1
+    return terminal[node]
+
+
+@njit(cache=True)
+def _walk_fuzzy(key_codes, node_char, child_start, terminal, max_depth, max_dist):
+    """
+    Bounded edit-distance search over a flattened trie, compiled with Numba.
+
+    Nodes are visited in pre-order with an explicit stack, so the row of the
+    parent at depth d - 1 is still intact in the scratch buffer whenever a
+    node at depth d is popped.
+
+    Args:
+        key_codes: Code points of the sequence being searched for
+        node_char: Code point on the edge leading into each node
+        child_start: Children of node i occupy child_start[i]:child_start[i + 1]
+        terminal: Value id stored at each node, or -1 for non-terminal nodes
+        max_depth: Length of the longest key in the trie
+        max_dist: Maximum number of edits allowed
+
+    Returns:
+        tuple: (value_id, distance) of the closest key, value_id is -1 if none is close enough
+    """
+    n = key_codes.shape[0]
+    rows = np.empty((max_depth + 1, n + 1), dtype=np.int32)
+    for j in range(n + 1):
+        rows[0, j] = j
+
+    best_id = -1
+    best_dist = max_dist + 1
+    if terminal[0] >= 0 and n < best_dist:
+        best_id = terminal[0]
+        best_dist = n
+
+    stack_node = np.empty(node_char.shape[0], dtype=np.int32)
+    stack_depth = np.empty(node_char.shape[0], dtype=np.int32)
+    top = 0
+
+    # Children are pushed last-to-first so they are popped in insertion order
+    for child in range(child_start[1] - 1, child_start[0] - 1, -1):
+        stack_node[top] = child
+        stack_depth[top] = 1
+        top += 1
+
+    while top > 0:
+        top -= 1
+        node = stack_node[top]
+        depth = stack_depth[top]
+        char = node_char[node]
+
+        # Wagner-Fischer row for this node from its parent's row
+        rows[depth, 0] = rows[depth - 1, 0] + 1
+        row_min = rows[depth, 0]
+        for j in range(1, n + 1):
+            cost = rows[depth - 1, j - 1]
+            if key_codes[j - 1] != char:
+                cost += 1
+            cost = min(cost, rows[depth - 1, j] + 1, rows[depth, j - 1] + 1)
+            rows[depth, j] = cost
+            row_min = min(row_min, cost)
+
+        # Accept a terminal node that improves on the best match so far
+        if terminal[node] >= 0 and rows[depth, n] < best_dist:
+            best_id = terminal[node]
+            best_dist = rows[depth, n]
+
+        # Only descend while some alignment can still beat the best match
+        if row_min < best_dist:
+            for child in range(child_start[node + 1] - 1, child_start[node] - 1, -1):
+                stack_node[top] = child
+                stack_depth[top] = depth + 1
+                top += 1
+
+    return best_id, best_dist
+
+
 class TrieNode:
     """
     A node in the Trie data structure.
     """
+    # Fixed attribute layout: no per-node __dict__
+    __slots__ = ('children', 'is_end_of_word', 'value', 'word', 'original_words')
+    
     def __init__(self):
         # Dictionary to store child nodes
         # Key: character, Value: TrieNode
@@ -16,8 +198,8 @@ class TrieNode:
         # Store the complete word at terminal nodes
         self.word = None
         
-        # Store original words with proper capitalization
-        self.original_words = []
+        # Store original words with proper capitalization, created only when needed
+        self.original_words = None
 
 
 class Trie:
@@ -41,12 +223,16 @@ class Trie:
         
         # Traverse the trie for each character in the key
         for char in key:
+            children = node.children
+            child_node = children.get(char)
+            
             # If character not in current node's children, add a new node
-            if char not in node.children:
-                node.children[char] = TrieNode()
+            if child_node is None:
+                child_node = TrieNode()
+                children[char] = child_node
             
             # Move to the child node
-            node = node.children[char]
+            node = child_node
         
         # Mark the end of the key
         node.is_end_of_word = True
@@ -75,15 +261,79 @@ class Trie:
         
         # Traverse the trie for each character in the key
         for char in key:
+            # Move to the child node
+            node = node.children.get(char)
+            
             # If character not found in current level, key doesn't exist
-            if char not in node.children:
+            if node is None:
                 return False, None, None
-            
-            # Move to the child node
-            node = node.children[char]
         
         # Return whether the key is a complete word, its associated value, and the stored word
         return node.is_end_of_word, node.value, node.word
+
+    def search_fuzzy(self, key, max_dist=2):
+        """
+        Search for the closest key in the trie within a bounded edit distance.
+
+        The trie is walked depth-first while carrying one row of the
+        Wagner-Fischer (Levenshtein) table per node, so subtrees that can no
+        longer come within max_dist of the key are pruned.
+
+        Args:
+            key: The sequence to search for.
+            max_dist: Maximum number of insertions, deletions or substitutions allowed.
+
+        Returns:
+            tuple: (is_found, value, word)
+                - is_found: True if a complete word lies within max_dist of the key, False otherwise.
+                - value: The value associated with the closest word if found, None otherwise.
+                - word: The closest complete word stored at the terminal node
+        """
+        # best[0] is the smallest distance found so far, best[1] the matching node
+        best = [max_dist + 1, None]
+
+        if len(key) >= VECTORIZE_MIN_KEY_LENGTH:
+            offsets = np.arange(len(key) + 1, dtype=np.int16)
+            key_codes = np.array([ord(c) for c in key], dtype=np.int32)
+            next_row = functools.partial(_next_row_vectorized, key_codes=key_codes, offsets=offsets)
+            first_row = offsets.copy()
+        else:
+            next_row = functools.partial(_next_row, key=key)
+            first_row = list(range(len(key) + 1))
+
+        # first_row holds the distance from each prefix of the key to ""
+        if self.root.is_end_of_word and first_row[-1] < best[0]:
+            best[0], best[1] = int(first_row[-1]), self.root
+
+        for char, child_node in self.root.children.items():
+            self._search_fuzzy_helper(child_node, char, next_row, first_row, best)
+
+        node = best[1]
+        if node is None:
+            return False, None, None
+        return True, node.value, node.word
+
+    def _search_fuzzy_helper(self, node, char, next_row, prev_row, best):
+        """
+        Recursive helper function for bounded edit-distance search.
+
+        Args:
+            node: Current TrieNode, reached from its parent through char
+            char: The character on the edge leading to node
+            next_row: Callable computing (row, row_min) from the parent's row and char
+            prev_row: Edit distances between each prefix of key and the parent's path
+            best: Mutable [distance, node] pair holding the closest match so far
+        """
+        cur_row, row_min = next_row(prev_row, char)
+
+        # Accept a terminal node that improves on the best match so far
+        if node.is_end_of_word and cur_row[-1] < best[0]:
+            best[0], best[1] = int(cur_row[-1]), node
+
+        # Only descend while some alignment can still beat the best match
+        if row_min < best[0]:
+            for next_char, child_node in node.children.items():
+                self._search_fuzzy_helper(child_node, next_char, next_row, cur_row, best)
     
     def starts_with(self, prefix):
         """
@@ -99,12 +349,12 @@ class Trie:
         
         # Traverse the trie for each character in the prefix
         for char in prefix:
+            # Move to the child node
+            node = node.children.get(char)
+            
             # If character not found in current level, prefix doesn't exist
-            if char not in node.children:
+            if node is None:
                 return False
-            
-            # Move to the child node
-            node = node.children[char]
         
         # Prefix exists
         return True
@@ -124,9 +374,9 @@ class Trie:
         
         # Traverse to the node representing the prefix
         for char in prefix:
-            if char not in node.children:
+            node = node.children.get(char)
+            if node is None:
                 return result
-            node = node.children[char]
         
         # Use DFS to find all words starting with the prefix
         self._dfs(node, prefix, result)
@@ -136,19 +386,26 @@ class Trie:
     def _dfs(self, node, current_prefix, result):
         """
         Depth-first search helper function for collecting all words with a prefix.
+        Uses an explicit stack instead of recursion, visiting children in insertion order.
         
         Args:
             node: The current TrieNode.
             current_prefix: The prefix built so far.
             result: The list to store results.
         """
-        if node.is_end_of_word:
-            # Use the stored complete word if available
-            word = node.word if node.word else current_prefix
-            result.append((word, node.value))
+        stack = [(node, current_prefix)]
         
-        for char, child_node in node.children.items():
-            self._dfs(child_node, current_prefix + char, result)
+        while stack:
+            node, current_prefix = stack.pop()
+            
+            if node.is_end_of_word:
+                # Use the stored complete word if available
+                word = node.word if node.word else current_prefix
+                result.append((word, node.value))
+            
+            # Push children in reverse so they are popped in insertion order
+            for char, child_node in reversed(node.children.items()):
+                stack.append((child_node, current_prefix + char))
     
     def delete(self, key):
         """
@@ -164,42 +421,210 @@ class Trie:
     
     def _delete_helper(self, node, key, depth):
         """
-        Recursive helper function for deleting a key.
+        Iterative helper function for deleting a key.
         
         Args:
-            node: Current TrieNode
+            node: TrieNode to start from
             key: Key to delete
-            depth: Current depth in the trie
+            depth: Index in the key that corresponds to node
             
         Returns:
-            bool: True if the node should be deleted, False otherwise
+            bool: True if the key was deleted, False if it didn't exist
         """
-        # Base case: reached the end of the key
-        if depth == len(key):
-            # Key doesn't exist as a complete word
-            if not node.is_end_of_word:
+        # Walk down the key, remembering the (parent, char) edge of every step
+        path = []
+        for char in key[depth:]:
+            child_node = node.children.get(char)
+            
+            # If character doesn't exist in current node's children
+            if child_node is None:
                 return False
             
-            # Unmark as end of word
-            node.is_end_of_word = False
-            node.value = None
+            path.append((node, char))
+            node = child_node
+        
+        # Key doesn't exist as a complete word
+        if not node.is_end_of_word:
+            return False
+        
+        # Unmark as end of word
+        node.is_end_of_word = False
+        node.value = None
+        
+        # Walk back up, removing nodes that no longer lead to any word
+        while path and len(node.children) == 0 and not node.is_end_of_word:
+            parent, char = path.pop()
+            del parent.children[char]
+            node = parent
+        
+        return True
+    
+    def freeze(self):
+        """
+        Flatten the trie into arrays for fast, read-only search.
+        
+        Returns:
+            FrozenTrie: An immutable snapshot of the current keys and values.
+        """
+        node_char = [0]
+        child_start = []
+        terminal = []
+        values = []
+        words = []
+        max_depth = 0
+        
+        # Breadth-first numbering places the children of every node next to
+        # each other, in the order their parents were numbered (CSR layout)
+        queue = [(self.root, 0)]
+        for node, depth in queue:
+            max_depth = max(max_depth, depth)
+            child_start.append(len(node_char))
+            
+            if node.is_end_of_word:
+                terminal.append(len(values))
+                values.append(node.value)
+                words.append(node.word)
+            else:
+                terminal.append(-1)
             
-            # Return True if this node has no children, indicating it can be deleted
-            return len(node.children) == 0
+            for char, child_node in node.children.items():
+                node_char.append(ord(char))
+                queue.append((child_node, depth + 1))
+        child_start.append(len(node_char))
         
-        char = key[depth]
+        return FrozenTrie(
+            np.array(node_char, dtype=np.int32),
+            np.array(child_start, dtype=np.int32),
+            np.array(terminal, dtype=np.int32),
+            values,
+            words,
+            max_depth,
+        )
+
+
+class FrozenTrie:
+    """
+    A read-only, flattened Trie produced by Trie.freeze().
+    Nodes are stored in CSR style: the children of node i are the
+    contiguous range child_start[i]:child_start[i + 1], kept in insertion
+    order, so searches run as compiled code over NumPy arrays.
+    """
+    def __init__(self, node_char, child_start, terminal, values, words, max_depth):
+        """
+        Initialize the frozen trie from its flattened arrays.
         
-        # If character doesn't exist in current node's children
-        if char not in node.children:
-            return False
+        Args:
+            node_char: Code point on the edge leading into each node (root is 0).
+            child_start: Offsets of each node's child range, one entry longer than node_char.
+            terminal: Index into values/words for terminal nodes, or -1.
+            values: Values of the stored keys.
+            words: The stored keys themselves.
+            max_depth: Length of the longest stored key.
+        """
+        self.node_char = node_char
+        self.child_start = child_start
+        self.terminal = terminal
+        self.values = values
+        self.words = words
+        self.max_depth = max_depth
+    
+    def save(self, path):
+        """
+        Save the frozen trie to an uncompressed .npz file.
+        
+        The data is written to a temporary file in the same directory and then
+        moved onto path, so readers never see a partially written file.
+        
+        Args:
+            path: Destination file path.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                np.savez(
+                    file,
+                    node_char=self.node_char,
+                    child_start=self.child_start,
+                    terminal=self.terminal,
+                    values=np.array(self.values, dtype=str),
+                    words=np.array(self.words, dtype=str),
+                    max_depth=np.array(self.max_depth),
+                )
+            
+            # mkstemp creates the file as 0600; give it the permissions a
+            # regular open() would under the current umask
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+            
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Load a frozen trie previously written by save().
+        
+        Args:
+            path: Path of the .npz file.
+            
+        Returns:
+            FrozenTrie: The restored trie.
+        """
+        with np.load(path) as data:
+            return cls(
+                data['node_char'],
+                data['child_start'],
+                data['terminal'],
+                data['values'].tolist(),
+                data['words'].tolist(),
+                int(data['max_depth']),
+            )
+    
+    def search(self, key):
+        """
+        Search for a key in the trie.
+        
+        Args:
+            key: The sequence to search for.
+            
+        Returns:
+            tuple: (is_found, value, word), as returned by Trie.search
+        """
+        key_codes = np.frombuffer(key.encode('utf-32-le'), dtype=np.int32)
+        value_id = _walk_exact(key_codes, self.node_char, self.child_start, self.terminal)
         
-        # Recursively delete in the child node
-        should_delete_child = self._delete_helper(node.children[char], key, depth + 1)
+        if value_id < 0:
+            return False, None, None
+        return True, self.values[value_id], self.words[value_id]
+    
+    def search_fuzzy(self, key, max_dist=2):
+        """
+        Search for the closest key within a bounded edit distance.
+        
+        Args:
+            key: The sequence to search for.
+            max_dist: Maximum number of insertions, deletions or substitutions allowed.
+            
+        Returns:
+            tuple: (is_found, value, word), as returned by Trie.search_fuzzy
+        """
+        # Keys longer than every stored word by more than max_dist cannot match
+        if len(key) - self.max_depth > max_dist:
+            return False, None, None
         
-        # If child should be deleted
-        if should_delete_child:
-            del node.children[char]
-            # Return True if this node has no other children and is not the end of another word
-            return len(node.children) == 0 and not node.is_end_of_word
+        key_codes = np.frombuffer(key.encode('utf-32-le'), dtype=np.int32)
+        value_id, _ = _walk_fuzzy(
+            key_codes,
+            self.node_char,
+            self.child_start,
+            self.terminal,
+            self.max_depth,
+            max_dist,
+        )
         
-        return False
\ No newline at end of file
+        if value_id < 0:
+            return False, None, None
+        return True, self.values[value_id], self.words[value_id]